@@ -1,13 +1,12 @@
 from typing import Annotated
 
 import typer
-import yaml
-from urllib.parse import quote_plus
 from datetime import datetime
 
 import mysql2pg as mysql2pg
-from mysql2pg.main import run_migration
-from mysql2pg.utils import create_engine, purge_schemas
+
+# Engines (sqlalchemy, polars, connectorx, ...) are imported inside each command so that
+# `--help` or `version` do not pay their import cost.
 
 app = typer.Typer()
 
@@ -21,11 +20,21 @@ def run(
     rename_column: Annotated[
         bool, typer.Option(help="Whether to rename columns in lowercase")
     ] = False,
+    profile: Annotated[
+        bool, typer.Option(help="Profile CPU and memory of each stage, dumps written in the log folder")
+    ] = False,
 ):
     """
     Run a migration from MySQL to PGSql based on a config file.
     """
-    run_migration(filepath=filepath, log_filepath=log_filepath, rename_column_option=rename_column)
+    from mysql2pg.main import run_migration
+
+    run_migration(
+        filepath=filepath,
+        log_filepath=log_filepath,
+        rename_column_option=rename_column,
+        profile=profile,
+    )
 
 
 @app.command()
@@ -48,6 +57,10 @@ def purge_db(
     """
     Purge a PostgreSQL database.
     """
+    import yaml
+
+    from mysql2pg.utils import build_pg_url, create_engine, purge_schemas
+
     start_time = datetime.now()
     log_file_name = (
         f'{log_filepath}/{start_time.strftime("migration_%Y-%m-%d_%H-%M-%S.log")}'
@@ -56,7 +69,5 @@ def purge_db(
     with open(filepath, "r") as file:
         cfg = yaml.safe_load(file)
 
-    encoded_password = quote_plus(cfg["pg_password"])
-    pg_url = f'postgresql://{cfg["pg_username"]}:{encoded_password}@{cfg["pg_host"]}:{cfg["pg_port"]}/{cfg["pg_database"]}'
-    postgres_engine = create_engine(pg_url)
+    postgres_engine = create_engine(build_pg_url(cfg))
     purge_schemas(postgres_engine)
@@ -0,0 +1,180 @@
+import polars as pl
+
+FLOAT_TOLERANCE = 1e-9
+TIMESTAMP_PRECISION = "1us"
+ROW_HASH = "__row_hash"
+ROW_OCCURRENCE = "__row_occurrence"
+
+
+def normalise_frame(dp, timestamp_precision=TIMESTAMP_PRECISION, case_insensitive_columns=None):
+    """
+    Normalise a frame read from MySQL or PostgreSQL so both sides can be compared.
+
+    Column names are lower cased, binaries are decoded as in the transfer, integers are
+    widened to Int64, decimals become Float64, trailing spaces are stripped (MySQL PAD SPACE
+    collations ignore them) and timestamps are truncated to a common precision.
+
+    Args:
+        dp (polars.DataFrame): The frame to normalise.
+        timestamp_precision (str, optional): Precision timestamps are truncated to. Default is "1us".
+        case_insensitive_columns (list, optional): Strings lower cased, for `_ci` collations. Default is None.
+
+    Returns:
+        polars.DataFrame: The normalised frame.
+    """
+    dp = dp.rename({col: col.lower() for col in dp.columns})
+    case_insensitive_columns = [c.lower() for c in case_insensitive_columns or []]
+
+    expressions = []
+    for name, dtype in dp.schema.items():
+        col = pl.col(name)
+        if dtype == pl.Binary:
+            col = col.cast(pl.Utf8)
+            dtype = pl.Utf8
+        if dtype == pl.Utf8:
+            col = col.str.strip_chars_end(" ")
+            if name in case_insensitive_columns:
+                col = col.str.to_lowercase()
+        elif dtype.is_integer():
+            col = col.cast(pl.Int64, strict=False)
+        elif dtype.is_decimal() or dtype.is_float():
+            col = col.cast(pl.Float64)
+        elif isinstance(dtype, pl.Datetime):
+            if dtype.time_zone is not None:
+                col = col.dt.convert_time_zone("UTC").dt.replace_time_zone(None)
+            col = col.cast(pl.Datetime("us")).dt.truncate(timestamp_precision)
+        expressions.append(col.alias(name))
+
+    return dp.select(expressions)
+
+
+def _align_dtypes(source, target, columns):
+    """
+    Cast columns whose dtype still differs between both frames to strings.
+    """
+    casts = [
+        pl.col(name).cast(pl.Utf8)
+        for name in columns
+        if source.schema[name] != target.schema[name]
+    ]
+    if casts:
+        source = source.with_columns(casts)
+        target = target.with_columns(casts)
+    return source, target
+
+
+def _mismatch_expression(name, dtype, suffix, float_tolerance):
+    """
+    Build the expression flagging rows where a column differs between both sides.
+    """
+    left = pl.col(name)
+    right = pl.col(f"{name}{suffix}")
+
+    if dtype == pl.Float64:
+        both_nan = left.is_nan() & right.is_nan()
+        scale = pl.max_horizontal(pl.lit(1.0), left.abs(), right.abs())
+        close = ((left - right).abs() <= float_tolerance * scale) | both_nan
+        return (
+            pl.when(left.is_null() & right.is_null())
+            .then(False)
+            .when(left.is_null() | right.is_null())
+            .then(True)
+            .otherwise(~close)
+        )
+    return left.ne_missing(right)
+
+
+def _add_row_hash(dp, columns):
+    """
+    Add a row hash, and an occurrence index so duplicated rows are matched one to one.
+
+    Float columns are left out of the hash, since values within tolerance may not hash
+    alike; they are compared after the join. Rows sharing a hash are numbered in the order
+    of their float values so both sides pair them the same way.
+    """
+    float_columns = [name for name in columns if dp.schema[name] == pl.Float64]
+    hashed = [pl.col(name) for name in columns if name not in float_columns] or [pl.lit(0)]
+    return (
+        dp.with_columns(pl.struct(hashed).hash().alias(ROW_HASH))
+        .sort([ROW_HASH] + float_columns, nulls_last=True)
+        .with_columns(pl.int_range(pl.len()).over(ROW_HASH).alias(ROW_OCCURRENCE))
+    )
+
+
+def compare_frames(
+    source,
+    target,
+    key_columns=None,
+    float_tolerance=FLOAT_TOLERANCE,
+    timestamp_precision=TIMESTAMP_PRECISION,
+    case_insensitive_columns=None,
+):
+    """
+    Compare two samples of the same table without relying on their row order.
+
+    Rows are matched with a hash join on the primary key, or on a row hash when the table
+    has no key. Floats are compared with a relative tolerance, timestamps at a common
+    precision and strings without trailing spaces.
+
+    Args:
+        source (polars.DataFrame): The sample read from MySQL.
+        target (polars.DataFrame): The sample read from PostgreSQL.
+        key_columns (list, optional): The primary key columns. Default is None (row hash).
+        float_tolerance (float, optional): Relative tolerance on floats. Default is 1e-9.
+        timestamp_precision (str, optional): Precision timestamps are truncated to. Default is "1us".
+        case_insensitive_columns (list, optional): Strings compared ignoring case. Default is None.
+
+    Returns:
+        dict: `missing_in_target` and `missing_in_source` row counts, `missing_columns` present
+        on one side only and `differing_columns` mapping each column to its mismatching row count.
+    """
+    source = normalise_frame(source, timestamp_precision, case_insensitive_columns)
+    target = normalise_frame(target, timestamp_precision, case_insensitive_columns)
+
+    missing_columns = sorted(set(source.columns) ^ set(target.columns))
+    columns = [c for c in source.columns if c in target.columns]
+    source, target = _align_dtypes(source.select(columns), target.select(columns), columns)
+
+    key_columns = [c.lower() for c in key_columns or [] if c.lower() in columns]
+    if not key_columns:
+        source = _add_row_hash(source, columns)
+        target = _add_row_hash(target, columns)
+        key_columns = [ROW_HASH, ROW_OCCURRENCE]
+
+    suffix = "__target"
+    joined = source.join(target, on=key_columns, how="inner", suffix=suffix)
+    value_columns = [c for c in columns if c not in key_columns]
+    if value_columns and not joined.is_empty():
+        counts = joined.select(
+            _mismatch_expression(name, source.schema[name], suffix, float_tolerance)
+            .sum()
+            .alias(name)
+            for name in value_columns
+        ).row(0, named=True)
+    else:
+        counts = {}
+
+    return {
+        "missing_in_target": source.height - joined.height,
+        "missing_in_source": target.height - joined.height,
+        "missing_columns": missing_columns,
+        "differing_columns": {name: count for name, count in counts.items() if count},
+    }
+
+
+def is_report_equal(report):
+    """
+    Check whether a report from `compare_frames` contains no difference.
+
+    Args:
+        report (dict): The comparison report.
+
+    Returns:
+        bool: True if both samples match.
+    """
+    return (
+        report["missing_in_target"] == 0
+        and report["missing_in_source"] == 0
+        and not report["missing_columns"]
+        and not report["differing_columns"]
+    )
@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import sqlalchemy as sa
+from loguru import logger
+
+DDL_WORKERS = 8
+LOCK_TIMEOUT = "5s"
+LOCK_RETRIES = 3
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def compile_alter_table(full_table_name, clauses):
+    """
+    Compile the changes of a table into a single multi-clause ALTER TABLE statement.
+
+    Args:
+        full_table_name (str): The table name, qualified with its schema.
+        clauses (list): The ALTER TABLE actions (e.g. 'ALTER COLUMN "a" SET NOT NULL').
+
+    Returns:
+        str: The statement, or None if there is nothing to change.
+    """
+    if not clauses:
+        return None
+    return f"ALTER TABLE {full_table_name} " + ", ".join(clauses) + ";"
+
+
+def execute_ddl(engine, statements, label, lock_timeout=LOCK_TIMEOUT, max_retries=LOCK_RETRIES):
+    """
+    Execute the DDL statements of a table in one transaction, bounded by a lock timeout.
+
+    When the lock cannot be acquired in time (a long query holds the table), the
+    transaction is rolled back and retried instead of blocking every query queued behind it.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        statements (list): The DDL statements to execute.
+        label (str): The table name, used in logs.
+        lock_timeout (str, optional): PostgreSQL lock_timeout for the transaction. Default is "5s".
+        max_retries (int, optional): Attempts on lock timeout. Default is 3.
+
+    Returns:
+        float: The time spent applying the DDL, in seconds.
+    """
+    start_time = time.perf_counter()
+    for attempt in range(1, max_retries + 1):
+        try:
+            with engine.begin() as connection:
+                connection.execute(sa.text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+                for statement in statements:
+                    connection.execute(sa.text(statement))
+            break
+        except sa.exc.OperationalError as e:
+            if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == max_retries:
+                raise
+            logger.warning(f"Lock timeout on {label}, attempt {attempt}/{max_retries}")
+            time.sleep(attempt)
+
+    duration = time.perf_counter() - start_time
+    logger.info(f"DDL applied on {label} in {duration:.2f}s")
+    return duration
+
+
+def run_ddl_in_parallel(func, tables, max_workers=DDL_WORKERS):
+    """
+    Apply a per-table DDL function concurrently on a bounded thread pool.
+
+    Args:
+        func (callable): Function taking a table name and returning its DDL time (or None).
+        tables (list): The tables to process.
+        max_workers (int, optional): Maximum number of tables processed at once. Default is 8.
+
+    Returns:
+        dict: The DDL time of each table that was altered.
+    """
+    durations = {}
+    if not tables:
+        return durations
+
+    def record(table, call):
+        try:
+            duration = call()
+        except Exception as e:
+            logger.error(f"{table} : {e}")
+            return
+        if duration:
+            durations[table] = duration
+
+    start_time = time.perf_counter()
+    if max_workers <= 1:
+        # Run on the calling thread, e.g. to be seen by cProfile
+        for table in tables:
+            record(table, lambda: func(table))
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(func, table): table for table in tables}
+            for future in as_completed(futures):
+                record(futures[future], future.result)
+
+    total_duration = time.perf_counter() - start_time
+    logger.info(
+        f"DDL done on {len(durations)}/{len(tables)} tables in {total_duration:.2f}s "
+        f"(cumulated DDL time {sum(durations.values()):.2f}s)"
+    )
+    for table, duration in sorted(durations.items(), key=lambda item: item[1], reverse=True)[:10]:
+        logger.info(f"DDL time {table} : {duration:.2f}s")
+    return durations
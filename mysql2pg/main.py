@@ -2,14 +2,18 @@ from datetime import datetime
 
 import yaml
 from loguru import logger
-from urllib.parse import quote_plus
 
+from mysql2pg.ddl import DDL_WORKERS, LOCK_TIMEOUT
 from mysql2pg.main_wrapper import migrate, rename_columns, sync_tables_structure
-from mysql2pg.utils import create_engine
+from mysql2pg.profiling import StageProfiler
+from mysql2pg.utils import build_pg_url, create_engine
 
 
 def run_migration(
-    filepath: str = "config.yaml", log_filepath: str = "logs", rename_column_option: bool = False
+    filepath: str = "config.yaml",
+    log_filepath: str = "logs",
+    rename_column_option: bool = False,
+    profile: bool = False,
 ):
     start_time = datetime.now()
     log_file_name = f'{log_filepath}/{start_time.strftime("migration_%Y-%m-%d_%H-%M-%S.log")}'
@@ -18,13 +22,21 @@ def run_migration(
     with open(filepath, "r") as file:
         cfg = yaml.safe_load(file)
 
-    encoded_password = quote_plus(cfg["pg_password"])
-    pg_url = f'postgresql://{cfg["pg_username"]}:{encoded_password}@{cfg["pg_host"]}:{cfg["pg_port"]}/{cfg["pg_database"]}'
-    postgres_engine = create_engine(pg_url)
+    ddl_workers = cfg.get("ddl_workers", DDL_WORKERS)
+    lock_timeout = cfg.get("lock_timeout", LOCK_TIMEOUT)
+
+    pg_url = build_pg_url(cfg)
+    postgres_engine = create_engine(pg_url, pool_size=ddl_workers)
 
     migration_mapping = cfg["migration_mapping"]
 
-    migrate(
+    profiler = (
+        StageProfiler(f'{log_filepath}/{start_time.strftime("profile_%Y-%m-%d_%H-%M-%S")}')
+        if profile
+        else None
+    )
+
+    network_stats = migrate(
         migration_mapping,
         cfg["sql_username"],
         cfg["sql_password"],
@@ -33,7 +45,21 @@ def run_migration(
         postgres_engine,
         pg_url,
         cfg["batch_size"],
+        profiler=profiler,
+        partition_by=cfg.get("partition_by"),
+        max_workers=ddl_workers,
+        compression=cfg.get("mysql_compression"),
+        ssl=cfg.get("mysql_ssl"),
     )
+    if network_stats:
+        mib = 1024**2
+        received = sum(stats["estimated_received"] for stats in network_stats.values())
+        sent = sum(stats["estimated_sent"] for stats in network_stats.values())
+        logger.info(
+            f"Network total : received ~{received / mib:.1f} MiB from MySQL, "
+            f"sent ~{sent / mib:.1f} MiB to PostgreSQL (estimated) over {len(network_stats)} tables"
+        )
+
     sync_tables_structure(
         migration_mapping,
         cfg["sql_username"],
@@ -41,10 +67,20 @@ def run_migration(
         cfg["sql_host"],
         cfg["sql_port"],
         postgres_engine,
+        profiler=profiler,
+        ddl_workers=ddl_workers,
+        lock_timeout=lock_timeout,
+        compression=cfg.get("mysql_compression"),
+        ssl=cfg.get("mysql_ssl"),
     )
 
     if rename_column_option:
-        rename_columns(migration_mapping, postgres_engine)
+        rename_columns(
+            migration_mapping, postgres_engine, ddl_workers=ddl_workers, lock_timeout=lock_timeout
+        )
+
+    if profiler is not None:
+        profiler.write_summary()
 
 
 if __name__ == "__main__":
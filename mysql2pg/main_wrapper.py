@@ -1,12 +1,19 @@
 from loguru import logger
 
+from mysql2pg.ddl import DDL_WORKERS, LOCK_TIMEOUT, run_ddl_in_parallel
+from mysql2pg.profiling import profile_stage
 from mysql2pg.sanity_check import sanity_check
 from mysql2pg.transfer_batch import transfer_data_in_batches
 from mysql2pg.utils import (
     check_if_table_exists,
+    check_if_table_has_rows,
+    build_mysql_urls,
     create_engine,
+    fetch_columns,
     fetch_tables,
+    fetch_auto_increment,
     rename_columns_to_lowercase,
+    sync_sequences,
     sync_table_structure,
 )
 
@@ -20,6 +27,11 @@ def migrate(
     postgres_engine,
     pg_url,
     batch_size,
+    profiler=None,
+    partition_by=None,
+    max_workers=DDL_WORKERS,
+    compression=None,
+    ssl=None,
 ):
     """
     Migrate data from MySQL to PostgreSQL for the specified schemas and tables.
@@ -31,18 +43,28 @@ def migrate(
         sql_host (str): The MySQL host.
         sql_port (int): The MySQL port.
         postgres_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        profiler (StageProfiler, optional): Profiler wrapping each stage. Default is None (no profiling).
+        partition_by (dict, optional): Partitioning of the target tables, by schema then table. Default is None.
+        max_workers (int, optional): Partitions loaded and indexed at once. Default is 8.
+        compression (str, optional): MySQL protocol compression, "zlib" or "zstd". Default is None.
+        ssl (dict, optional): MySQL SSL settings (`ca`, `cert`, `key`, `verify_identity`). Default is None.
+
+    Returns:
+        dict: The network bytes of each transferred table, by "schema.table".
     """
 
     logger.info("******************** Migration **********************")
+    network_stats = {}
 
     for schema in migration_mapping.keys():
         logger.info(f"*********** Schema set to {schema} ************ \n")
         # SQLAlchemy database URL
-        mysql_url = f"mysql+pymysql://{sql_username}:{sql_password}@{sql_host}:{sql_port}/{schema}"
-        sql_url_no_driver = f"mysql://{sql_username}:{sql_password}@{sql_host}:{sql_port}/{schema}"
+        mysql_url, sql_url_no_driver, connect_args = build_mysql_urls(
+            sql_username, sql_password, sql_host, sql_port, schema, compression, ssl
+        )
 
         # Create SQLAlchemy engine
-        sql_engine = create_engine(mysql_url)
+        sql_engine = create_engine(mysql_url, connect_args=connect_args)
 
         # Retrieve all tables
         tables = fetch_tables(sql_engine)
@@ -66,26 +88,30 @@ def migrate(
                     )
                     logger.info(f"Starting migration with offset {offset_start}")
 
-                    transfer_data_in_batches(
-                        source_string=sql_url_no_driver,
-                        target_engine=postgres_engine,
-                        target_string=pg_url,
-                        table=table,
-                        source_engine=sql_engine,
-                        schema=schema,
-                        batch_size=batch_size,
-                        offset_start=offset_start,
-                        row_total=row_count_sql,
-                    )
-
-                    out = sanity_check(
-                        postgres_engine,
-                        pg_url,
-                        sql_url_no_driver,
-                        row_count_sql,
-                        schema,
-                        table,
-                    )
+                    with profile_stage(profiler, "transfer", schema, table):
+                        network_stats[f"{schema}.{table}"] = transfer_data_in_batches(
+                            source_string=sql_url_no_driver,
+                            target_engine=postgres_engine,
+                            target_string=pg_url,
+                            table=table,
+                            source_engine=sql_engine,
+                            schema=schema,
+                            batch_size=batch_size,
+                            offset_start=offset_start,
+                            row_total=row_count_sql,
+                            partition=((partition_by or {}).get(schema) or {}).get(table),
+                            # cProfile only sees the main thread : load partitions inline
+                            max_workers=1 if profiler is not None else max_workers,
+                        )
+
+                    with profile_stage(profiler, "sanity_check", schema, table):
+                        out = sanity_check(
+                            pg_url,
+                            sql_url_no_driver,
+                            row_count_sql,
+                            schema,
+                            table,
+                        )
 
                     if out == 0:
                         logger.success(f"Migration done for {table}")
@@ -93,14 +119,14 @@ def migrate(
                         logger.warning("Migration encountered an issue")
 
                 else:
-                    out = sanity_check(
-                        postgres_engine,
-                        pg_url,
-                        sql_url_no_driver,
-                        row_count_sql,
-                        schema,
-                        table,
-                    )
+                    with profile_stage(profiler, "sanity_check", schema, table):
+                        out = sanity_check(
+                            pg_url,
+                            sql_url_no_driver,
+                            row_count_sql,
+                            schema,
+                            table,
+                        )
 
                     if out == 0:
                         logger.success(f"Migration done for {table}")
@@ -112,29 +138,58 @@ def migrate(
 
             logger.info(f"Avancement of schema processed : {(idx+1)/len(tables):.0%} \n\n")
 
+    return network_stats
+
 
-def rename_columns(migration_mapping, postgres_engine):
+def rename_columns(
+    migration_mapping, postgres_engine, ddl_workers=DDL_WORKERS, lock_timeout=LOCK_TIMEOUT
+):
     """
     Rename all columns to lowercase for the specified schemas in PostgreSQL.
 
     Args:
         migration_mapping (dict): A dictionary specifying the schemas to rename columns for.
         postgres_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        ddl_workers (int, optional): Number of tables renamed concurrently. Default is 8.
+        lock_timeout (str, optional): PostgreSQL lock_timeout for each table. Default is "5s".
     """
 
     for schema in migration_mapping.keys():
         logger.info(f"*********** Schema set to {schema} ************ \n")
+        columns = fetch_columns(postgres_engine, schema)
         tables = fetch_tables(postgres_engine, schema=schema)
-        for table in tables:
-            rename_columns_to_lowercase(postgres_engine, table, schema)
+        run_ddl_in_parallel(
+            lambda table: rename_columns_to_lowercase(
+                postgres_engine,
+                table,
+                schema,
+                columns=columns.get(table, []),
+                lock_timeout=lock_timeout,
+            ),
+            tables,
+            max_workers=ddl_workers,
+        )
 
 
 def sync_tables_structure(
-    migration_mapping, sql_username, sql_password, sql_host, sql_port, postgres_engine
+    migration_mapping,
+    sql_username,
+    sql_password,
+    sql_host,
+    sql_port,
+    postgres_engine,
+    profiler=None,
+    ddl_workers=DDL_WORKERS,
+    lock_timeout=LOCK_TIMEOUT,
+    compression=None,
+    ssl=None,
 ):
     """
     Synchronize the table structure from MySQL to PostgreSQL for the specified schemas and tables.
 
+    AUTO_INCREMENT columns become identity columns, then their sequences are set in a
+    single pass per schema.
+
     Args:
         migration_mapping (dict): A dictionary specifying the schemas and tables to synchronize.
         sql_username (str): The MySQL username.
@@ -142,16 +197,33 @@ def sync_tables_structure(
         sql_host (str): The MySQL host.
         sql_port (int): The MySQL port.
         postgres_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        profiler (StageProfiler, optional): Profiler wrapping each stage. Default is None (no profiling).
+        ddl_workers (int, optional): Number of tables synchronized concurrently. Default is 8.
+        lock_timeout (str, optional): PostgreSQL lock_timeout for each table. Default is "5s".
+        compression (str, optional): MySQL protocol compression, "zlib" or "zstd". Default is None.
+        ssl (dict, optional): MySQL SSL settings (`ca`, `cert`, `key`, `verify_identity`). Default is None.
     """
     logger.info("******************** Synchronization tables constraints **********************")
 
     for schema in migration_mapping.keys():
         logger.info(f"*********** Schema set to {schema} ************ \n")
         # SQLAlchemy database URL
-        mysql_url = f"mysql+pymysql://{sql_username}:{sql_password}@{sql_host}:{sql_port}/{schema}"
+        mysql_url, _, connect_args = build_mysql_urls(
+            sql_username, sql_password, sql_host, sql_port, schema, compression, ssl
+        )
 
-        # Create SQLAlchemy engine
-        sql_engine = create_engine(mysql_url)
+        # Create SQLAlchemy engine, with a connection per worker
+        sql_engine = create_engine(mysql_url, pool_size=ddl_workers, connect_args=connect_args)
+
+        def sync_table(table):
+            # A single row read on each side, not a count of the table
+            if check_if_table_has_rows(table, sql_engine) and check_if_table_has_rows(
+                table, postgres_engine, schema=schema
+            ):
+                with profile_stage(profiler, "sync_structure", schema, table):
+                    return sync_table_structure(
+                        sql_engine, postgres_engine, schema, table, lock_timeout=lock_timeout
+                    )
 
         try:
             # Retrieve all tables
@@ -162,12 +234,19 @@ def sync_tables_structure(
                 else tables
             )
 
-            # Retrieve and logger.info data from each table using Polars
-            for table in tables:
-                row_count_sql = check_if_table_exists(table, sql_engine)
-                row_count_pg = check_if_table_exists(table, postgres_engine)
-                if row_count_pg * row_count_sql > 0:
-                    sync_table_structure(sql_engine, postgres_engine, schema, table)
+            # cProfile can only profile one thread at a time
+            run_ddl_in_parallel(
+                sync_table, tables, max_workers=1 if profiler is not None else ddl_workers
+            )
+
+            # Restart every identity / sequence at once, from the MySQL catalog
+            auto_increment_columns, next_values = fetch_auto_increment(sql_engine, schema)
+            sync_sequences(
+                postgres_engine,
+                schema,
+                {t: c for t, c in auto_increment_columns.items() if t in tables},
+                next_values,
+                lock_timeout=lock_timeout,
+            )
         except Exception as e:
             logger.error(e)
-            logger.error(e)
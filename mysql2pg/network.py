@@ -0,0 +1,110 @@
+import sqlalchemy as sa
+from loguru import logger
+
+MYSQL_BYTES_QUERY = """SELECT VARIABLE_NAME, VARIABLE_VALUE
+    FROM performance_schema.status_by_account
+    WHERE USER = SUBSTRING_INDEX(USER(), '@', 1)
+    AND HOST = SUBSTRING_INDEX(USER(), '@', -1)
+    AND VARIABLE_NAME IN ('Bytes_sent', 'Bytes_received')"""
+
+
+def read_mysql_bytes(engine):
+    """
+    Read the bytes exchanged by the MySQL server with the migration account.
+
+    connectorx opens its own connections, so its traffic is measured on the server side:
+    performance_schema aggregates the wire bytes (compressed when compression is on) of the
+    current and terminated sessions of each user and client host. Other sessions opened
+    meanwhile by the same user from the same host are counted too.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the MySQL database.
+
+    Returns:
+        tuple: (bytes sent by MySQL, bytes received by MySQL), or None if not readable.
+    """
+    try:
+        with engine.connect() as connection:
+            rows = dict(connection.execute(sa.text(MYSQL_BYTES_QUERY)).fetchall())
+        return int(rows.get("Bytes_sent", 0)), int(rows.get("Bytes_received", 0))
+    except Exception as e:
+        logger.debug(f"MySQL network counters not available : {e}")
+        return None
+
+
+class NetworkStats:
+    """
+    Accumulate the network bytes of a table transfer.
+
+    The MySQL side is measured on the wire with `read_mysql_bytes`. PostgreSQL exposes no
+    network counters, so the bytes sent there are estimated with the in-memory size of the
+    loaded batches; the in-memory size of the downloaded batches is kept alongside the MySQL
+    wire bytes to estimate the compression ratio.
+
+    Args:
+        source_engine (sqlalchemy.engine.Engine, optional): The SQLAlchemy engine for the MySQL database.
+    """
+
+    def __init__(self, source_engine=None):
+        self.source_engine = source_engine
+        self.start = read_mysql_bytes(source_engine) if source_engine is not None else None
+        self.estimated_received = 0
+        self.estimated_sent = 0
+        self.download_time = 0.0
+        self.wire_received = None
+        self.wire_sent = None
+
+    def add_download(self, dp, duration):
+        """
+        Record a batch downloaded from MySQL.
+        """
+        self.estimated_received += dp.estimated_size()
+        self.download_time += duration
+
+    def add_upload(self, dp):
+        """
+        Record a batch loaded into PostgreSQL.
+        """
+        self.estimated_sent += dp.estimated_size()
+
+    def stop(self):
+        """
+        Read the MySQL counters again to compute the wire bytes of the transfer.
+        """
+        if self.start is None:
+            return
+        end = read_mysql_bytes(self.source_engine)
+        if end is not None:
+            self.wire_received = end[0] - self.start[0]
+            self.wire_sent = end[1] - self.start[1]
+
+    def report(self, table):
+        """
+        Log the bytes received and sent for the table.
+
+        Args:
+            table (str): The name of the table.
+
+        Returns:
+            dict: The byte counts of the table.
+        """
+        mib = 1024**2
+        message = (
+            f"Network {table} : received ~{self.estimated_received / mib:.1f} MiB (estimated) "
+            f"in {self.download_time:.2f}s, sent ~{self.estimated_sent / mib:.1f} MiB "
+            f"(estimated) to PostgreSQL"
+        )
+        if self.wire_received is not None:
+            ratio = self.estimated_received / self.wire_received if self.wire_received else 0
+            message += (
+                f", MySQL wire {self.wire_received / mib:.1f} MiB received / "
+                f"{self.wire_sent / mib:.1f} MiB sent (ratio {ratio:.2f}x)"
+            )
+        logger.info(message)
+        return {
+            "estimated_received": self.estimated_received,
+            "wire_received": self.wire_received,
+            "wire_sent": self.wire_sent,
+            "estimated_sent": self.estimated_sent,
+            "download_time": self.download_time,
+        }
@@ -0,0 +1,374 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from adbc_driver_postgresql import dbapi
+
+import polars as pl
+from loguru import logger
+
+from mysql2pg.ddl import DDL_WORKERS, execute_ddl, run_ddl_in_parallel
+from mysql2pg.retry_decorator import retry_on_failure
+
+PARTITION_COLUMN = "__partition"
+DEFAULT_PARTITION = "default"
+MAX_PARTITIONS = 1000
+DDL_CHUNK_SIZE = 100
+PG_NAME_LENGTH = 63
+RANGE_INTERVALS = {
+    "day": ("1d", "%Y%m%d"),
+    "month": ("1mo", "%Y%m"),
+    "year": ("1y", "%Y"),
+}
+
+
+def pg_type(dtype):
+    """
+    Map a Polars dtype to the PostgreSQL type used to create a partitioned parent table.
+
+    Args:
+        dtype (polars.DataType): The Polars dtype.
+
+    Returns:
+        str: The PostgreSQL type.
+    """
+    if dtype in (pl.Int8, pl.Int16, pl.UInt8):
+        return "smallint"
+    if dtype in (pl.Int32, pl.UInt16):
+        return "integer"
+    if dtype in (pl.Int64, pl.UInt32):
+        return "bigint"
+    if dtype == pl.UInt64 or dtype.is_decimal():
+        return "numeric"
+    if dtype == pl.Float32:
+        return "real"
+    if dtype == pl.Float64:
+        return "double precision"
+    if dtype == pl.Boolean:
+        return "boolean"
+    if dtype == pl.Date:
+        return "date"
+    if isinstance(dtype, pl.Datetime):
+        return "timestamp with time zone" if dtype.time_zone else "timestamp"
+    if dtype == pl.Time:
+        return "time"
+    if isinstance(dtype, pl.Duration):
+        return "interval"
+    if dtype == pl.Binary:
+        return "bytea"
+    return "text"
+
+
+def _truncate(value, interval):
+    """
+    Truncate a date to the start of its range partition.
+    """
+    if interval == "day":
+        return date(value.year, value.month, value.day)
+    if interval == "month":
+        return date(value.year, value.month, 1)
+    return date(value.year, 1, 1)
+
+
+def _previous_start(start, interval):
+    """
+    Return the start of the range partition preceding `start`.
+    """
+    if interval == "day":
+        return date.fromordinal(start.toordinal() - 1)
+    if interval == "month":
+        return date(start.year - (start.month == 1), (start.month - 2) % 12 + 1, 1)
+    return date(start.year - 1, 1, 1)
+
+
+def _next_start(start, interval):
+    """
+    Return the start of the range partition following `start`.
+    """
+    if interval == "day":
+        return date.fromordinal(start.toordinal() + 1)
+    if interval == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return date(start.year + 1, 1, 1)
+
+
+@retry_on_failure
+def fetch_partition_bounds(source_string, table, column):
+    """
+    Retrieve the bounds of the range partition column in the source table.
+
+    Args:
+        source_string (str): The connection string for the source database.
+        table (str): The name of the table.
+        column (str): The partition column.
+
+    Returns:
+        tuple: (min, max) of the column, or None if the table is empty.
+    """
+    dp = pl.read_database_uri(
+        f"SELECT MIN({column}) AS low, MAX({column}) AS high FROM {table}", source_string
+    )
+    low, high = dp.row(0)
+    if low is None or high is None:
+        return None
+    return low, high
+
+
+def pg_name(*parts):
+    """
+    Join name parts into a PostgreSQL identifier of at most 63 characters.
+
+    PostgreSQL truncates longer identifiers, so two long names could collide; they are
+    shortened with a hash suffix instead.
+
+    Returns:
+        str: The identifier.
+    """
+    name = "_".join(parts)
+    if len(name) <= PG_NAME_LENGTH:
+        return name
+    suffix = hashlib.md5(name.encode()).hexdigest()[:8]
+    return f"{name[: PG_NAME_LENGTH - len(suffix) - 1]}_{suffix}"
+
+
+def list_partitions(table, partition, bounds=None, max_partitions=MAX_PARTITIONS):
+    """
+    List the child partitions of a table and their bound clause.
+
+    Range partitions cover at most `max_partitions` intervals, the most recent ones: older
+    rows (e.g. a sentinel date) go to the default partition.
+
+    Args:
+        table (str): The name of the parent table.
+        partition (dict): The `partition_by` entry of the table.
+        bounds (tuple, optional): (min, max) of the range partition column. Default is None.
+        max_partitions (int, optional): Maximum number of range partitions. Default is 1000.
+
+    Returns:
+        dict: The bound clause of each child suffix (e.g. "p202401"), the default partition included.
+    """
+    children = {}
+    if partition["method"] == "range":
+        interval = partition.get("interval", "month")
+        _, name_format = RANGE_INTERVALS[interval]
+        if bounds is not None:
+            starts = [_truncate(bounds[1], interval)]
+            low = _truncate(bounds[0], interval)
+            # Walk back from the most recent interval, bounded by max_partitions
+            while len(starts) < max_partitions and starts[0] > low:
+                starts.insert(0, _previous_start(starts[0], interval))
+            if starts[0] > low:
+                logger.warning(
+                    f"{table} spans more than {max_partitions} partitions, rows before "
+                    f"{starts[0].isoformat()} go to the default partition"
+                )
+            for start in starts:
+                end = _next_start(start, interval)
+                children[f"p{start.strftime(name_format)}"] = (
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+    else:
+        for remainder in range(partition["partitions"]):
+            children[f"p{remainder}"] = f"FOR VALUES IN ({remainder})"
+
+    children[DEFAULT_PARTITION] = "DEFAULT"
+    return children
+
+
+def _partition_key(partition):
+    """
+    Return the PARTITION BY clause of the parent table.
+
+    Hash partitioning is declared as LIST partitioning on `abs(column) % partitions`:
+    PostgreSQL internal hash function cannot be computed client side, while this key can be
+    bucketed with Polars so each child is loaded directly.
+    """
+    column = partition["column"]
+    if partition["method"] == "range":
+        return f'RANGE ("{column}")'
+    return f'LIST ((abs("{column}") % {partition["partitions"]}))'
+
+
+def create_partitioned_table(engine, dp, schema, table, partition, children):
+    """
+    Create the partitioned parent table and its child partitions if they do not exist.
+
+    The children are created by chunks, each in its own transaction, to stay below
+    `max_locks_per_transaction`.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        dp (polars.DataFrame): A batch of the table, used for the column types.
+        schema (str): The schema of the table.
+        table (str): The name of the table.
+        partition (dict): The `partition_by` entry of the table.
+        children (dict): The child partitions, as returned by `list_partitions`.
+    """
+    columns = ", ".join(f'"{name}" {pg_type(dtype)}' for name, dtype in dp.schema.items())
+    execute_ddl(
+        engine,
+        [
+            f"CREATE TABLE IF NOT EXISTS {schema}.{table} ({columns}) "
+            f"PARTITION BY {_partition_key(partition)};"
+        ],
+        f"{schema}.{table}",
+    )
+
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {schema}.{pg_name(table, suffix)} "
+        f"PARTITION OF {schema}.{table} {bound};"
+        for suffix, bound in children.items()
+    ]
+    for idx in range(0, len(statements), DDL_CHUNK_SIZE):
+        execute_ddl(engine, statements[idx : idx + DDL_CHUNK_SIZE], f"{schema}.{table}")
+    logger.info(f"Partitioned table {table} ready with {len(children)} partitions")
+
+
+def route_partitions(dp, table, partition, children):
+    """
+    Split a batch by child partition with a vectorized bucketing of the partition column.
+
+    Args:
+        dp (polars.DataFrame): The batch to split.
+        table (str): The name of the parent table.
+        partition (dict): The `partition_by` entry of the table.
+        children (dict): The child partitions, as returned by `list_partitions`.
+
+    Returns:
+        dict: The rows of each child table name.
+    """
+    column = pl.col(partition["column"])
+    if partition["method"] == "range":
+        every, name_format = RANGE_INTERVALS[partition.get("interval", "month")]
+        suffix = pl.lit("p") + column.dt.truncate(every).dt.strftime(name_format)
+    else:
+        suffix = pl.lit("p") + (column.abs() % partition["partitions"]).cast(pl.Utf8)
+
+    child = suffix.replace_strict(
+        {name: pg_name(table, name) for name in children},
+        default=pg_name(table, DEFAULT_PARTITION),
+        return_dtype=pl.Utf8,
+    ).alias(PARTITION_COLUMN)
+
+    parts = dp.with_columns(child).partition_by(PARTITION_COLUMN, as_dict=True)
+    return {key[0]: part.drop(PARTITION_COLUMN) for key, part in parts.items()}
+
+
+def open_partition_connections(target_string, max_workers=DDL_WORKERS):
+    """
+    Open the ADBC connections used to load the partitions of a table.
+
+    They are opened once per table and reused by every batch, so the number of PostgreSQL
+    backends stays bounded by `max_workers` whatever the number of child partitions.
+
+    Args:
+        target_string (str): The connection string for the target database.
+        max_workers (int, optional): Number of connections, i.e. partitions loaded at once. Default is 8.
+
+    Returns:
+        list: The ADBC connections, to close with `close_partition_connections`.
+    """
+    connections = []
+    try:
+        for _ in range(max(1, max_workers)):
+            connections.append(dbapi.connect(target_string))
+    except Exception:
+        close_partition_connections(connections)
+        raise
+    return connections
+
+
+def close_partition_connections(connections):
+    """
+    Close the ADBC connections opened by `open_partition_connections`.
+
+    Args:
+        connections (list): The ADBC connections.
+    """
+    for connection in connections:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.error(e)
+
+
+def transfer_partitions(parts, schema, connections):
+    """
+    Load the child partitions of a batch concurrently, directly into the child tables.
+
+    The partitions are spread across the connections, each loading its share with ADBC in
+    one open transaction. The transactions are committed once every partition is loaded,
+    and all rolled back if a load fails. The commits are not atomic across connections
+    though: if one of them fails, the ones before it are already durable. With a single
+    connection the batch is loaded in one transaction, on the calling thread.
+
+    Args:
+        parts (dict): The rows of each child table name.
+        schema (str): The schema of the table.
+        connections (list): The ADBC connections, see `open_partition_connections`.
+    """
+    connections = connections[: max(1, len(parts))]
+    shares = [list(parts.items())[idx :: len(connections)] for idx in range(len(connections))]
+
+    def load(connection, share):
+        with connection.cursor() as cursor:
+            for child, part in share:
+                cursor.adbc_ingest(child, part.to_arrow(), mode="append", db_schema_name=schema)
+
+    try:
+        if len(connections) == 1:
+            load(connections[0], shares[0])
+        else:
+            with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+                futures = [
+                    executor.submit(load, connection, share)
+                    for connection, share in zip(connections, shares)
+                ]
+                for future in futures:
+                    future.result()
+        for connection in connections:
+            connection.commit()
+    except Exception:
+        for connection in connections:
+            try:
+                connection.rollback()
+            except Exception as e:
+                logger.error(e)
+        raise
+
+
+def build_partition_indexes(engine, schema, table, partition, children, max_workers=DDL_WORKERS):
+    """
+    Index the partition column of every child in parallel, then attach them to a parent index.
+
+    Creating the parent index last only attaches the matching child indexes, so the
+    expensive builds all run concurrently.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        schema (str): The schema of the table.
+        table (str): The name of the parent table.
+        partition (dict): The `partition_by` entry of the table.
+        children (dict): The child partitions, as returned by `list_partitions`.
+        max_workers (int, optional): Maximum number of indexes built at once. Default is 8.
+    """
+    column = partition["column"]
+
+    def build_index(suffix):
+        child = pg_name(table, suffix)
+        index = pg_name(table, suffix, column, "idx")
+        return execute_ddl(
+            engine,
+            [f'CREATE INDEX IF NOT EXISTS {index} ON {schema}.{child} ("{column}");'],
+            f"{schema}.{child}",
+        )
+
+    run_ddl_in_parallel(build_index, list(children), max_workers=max_workers)
+    execute_ddl(
+        engine,
+        [
+            f"CREATE INDEX IF NOT EXISTS {pg_name(table, column, 'idx')} "
+            f'ON {schema}.{table} ("{column}");'
+        ],
+        f"{schema}.{table}",
+    )
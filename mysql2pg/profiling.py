@@ -0,0 +1,148 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from loguru import logger
+
+SNAPSHOT_INTERVAL = 0.5
+SNAPSHOT_GROWTH = 1.1
+
+
+class StageProfiler:
+    """
+    Collect CPU (cProfile) and memory (tracemalloc) profiles for each pipeline stage.
+
+    One `.prof` dump is written per (stage, schema, table) and can be opened with
+    `python -m pstats` or snakeviz. Call `write_summary` at the end of the run to get
+    the hottest functions and allocation sites across all stages.
+
+    Allocation sites are measured as the growth between a snapshot taken at the start of the
+    stage and the snapshot taken closest to its memory peak, sampled by a background thread.
+
+    Args:
+        output_dir (str): Folder where the profile dumps and the summary are written.
+        top_n (int, optional): Number of functions / allocation sites kept in the summary. Default is 25.
+        snapshot_interval (float, optional): Seconds between two memory samples. Default is 0.5.
+    """
+
+    def __init__(self, output_dir, top_n=25, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.snapshot_interval = snapshot_interval
+        self.dump_files = []
+        self.records = []
+        self.allocations = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    @contextmanager
+    def profile(self, stage, schema, table):
+        """
+        Profile the wrapped block as one stage of a table migration.
+
+        Args:
+            stage (str): Name of the pipeline stage (e.g. "transfer").
+            schema (str): The schema of the table being processed.
+            table (str): The name of the table being processed.
+        """
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        start_snapshot = tracemalloc.take_snapshot()
+
+        # Keep the snapshot taken when the traced memory is the highest
+        peak_snapshot = {"size": 0, "snapshot": None}
+        stop_sampling = threading.Event()
+
+        def sample_memory():
+            while not stop_sampling.wait(self.snapshot_interval):
+                current, _ = tracemalloc.get_traced_memory()
+                if current > peak_snapshot["size"] * SNAPSHOT_GROWTH:
+                    peak_snapshot["snapshot"] = tracemalloc.take_snapshot()
+                    peak_snapshot["size"] = current
+
+        sampler = threading.Thread(target=sample_memory, daemon=True)
+        sampler.start()
+
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start_time
+            stop_sampling.set()
+            sampler.join()
+            current, peak = tracemalloc.get_traced_memory()
+            if peak_snapshot["snapshot"] is None or current > peak_snapshot["size"]:
+                peak_snapshot["snapshot"] = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+            dump_file = os.path.join(self.output_dir, f"{schema}.{table}.{stage}.prof")
+            profiler.dump_stats(dump_file)
+            self.dump_files.append(dump_file)
+            self.records.append((stage, schema, table, duration, peak))
+
+            growth = peak_snapshot["snapshot"].compare_to(start_snapshot, "lineno")
+            for stat in [stat for stat in growth if stat.size_diff > 0][: self.top_n]:
+                site = str(stat.traceback[0])
+                self.allocations[site] = max(self.allocations.get(site, 0), stat.size_diff)
+
+            logger.info(
+                f"Profile {stage} for {schema}.{table} : {duration:.2f}s, "
+                f"peak memory {peak / 1024**2:.1f} MiB"
+            )
+
+    def write_summary(self):
+        """
+        Write the per-stage timings, top hot functions and top allocation sites to a summary file.
+
+        Returns:
+            str: The path of the summary file, or None if nothing was profiled.
+        """
+        if not self.dump_files:
+            return None
+
+        buffer = io.StringIO()
+        buffer.write("Stage timings\n")
+        for stage, schema, table, duration, peak in self.records:
+            buffer.write(
+                f"{stage:<16} {schema}.{table:<40} {duration:>10.2f}s {peak / 1024**2:>10.1f} MiB\n"
+            )
+
+        buffer.write(f"\nTop {self.top_n} hot functions (cumulative time)\n")
+        stats = pstats.Stats(*self.dump_files, stream=buffer)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.top_n)
+
+        buffer.write(f"Top {self.top_n} allocation sites (growth at the stage memory peak)\n")
+        top_sites = sorted(self.allocations.items(), key=lambda item: item[1], reverse=True)
+        for site, size in top_sites[: self.top_n]:
+            buffer.write(f"{size / 1024**2:>10.2f} MiB  {site}\n")
+
+        summary_file = os.path.join(self.output_dir, "summary.txt")
+        with open(summary_file, "w") as file:
+            file.write(buffer.getvalue())
+
+        logger.info(f"Profiling summary written to {summary_file}")
+        return summary_file
+
+
+def profile_stage(profiler, stage, schema, table):
+    """
+    Return a profiling context for a stage, or a no-op context when profiling is off.
+
+    Args:
+        profiler (StageProfiler): The active profiler, or None.
+        stage (str): Name of the pipeline stage.
+        schema (str): The schema of the table being processed.
+        table (str): The name of the table being processed.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.profile(stage, schema, table)
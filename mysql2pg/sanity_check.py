@@ -1,108 +1,322 @@
-import sqlalchemy as sa
 import polars as pl
 from loguru import logger
 import random
+from datetime import date, datetime, time
+from decimal import Decimal
+from mysql2pg.compare import compare_frames, is_report_equal
 from mysql2pg.retry_decorator import retry_on_failure
 
 
-def sanity_check(engine, pg_url, mysql_url_no_driver, row_count_sql, schema, table):
+INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "bigint")
+DATE_TYPES = ("date", "datetime")
+SAMPLE_ROWS = 50000
+
+
+def sanity_check(pg_url, mysql_url_no_driver, row_count_sql, schema, table):
     LOOP_SANITY = 5
     logger.info("Performing sanity check ..")
 
-    metadata = sa.MetaData()
-    metadata.reflect(bind=engine, schema=schema)
-    table_sql = sa.Table(table, metadata, schema=schema, autoload_with=engine)
-
-    with engine.connect() as connection:
-        # Begin a transaction
-        with connection.begin():
-
-            order_columns = [
-                c.name
-                for c in table_sql.columns
-                if not isinstance(c.type, sa.Float)
-                and not isinstance(c.type, sa.DOUBLE)
-                and not isinstance(c.type, sa.DOUBLE_PRECISION)
-                and not isinstance(c.type, sa.Double)
-            ]
-            order_columns = [
-                c.name
-                for c in table_sql.columns
-                if c.name in order_columns
-                or ("id" in c.name and c.name not in order_columns)
-            ]
-
-    order_by_clause = ", ".join(order_columns)
-
-    i = 1
-    if row_count_sql > 1e6:
-        logger.info("Sanity check by batch because too large dataset")
-        while i <= LOOP_SANITY:
-
-            limit = random.randint(int(row_count_sql * 0.1), int(row_count_sql))
-            offset = random.randint(0, int(row_count_sql - limit))
+    key_columns = fetch_primary_key(mysql_url_no_driver, schema, table)
+    column_types, case_insensitive_columns = fetch_column_types(
+        mysql_url_no_driver, schema, table
+    )
+
+    if row_count_sql <= 1e6:
+        is_equal = check_is_equal(
+            schema,
+            table,
+            key_columns,
+            pg_url,
+            mysql_url_no_driver,
+            case_insensitive_columns=case_insensitive_columns,
+        )
+
+        if is_equal:
+            logger.success("Sanity check passed !")
+            return 0
+        else:
+            logger.warning(f"Sanity check failed")
+            return 1
+
+    sample_column = pick_sample_column(column_types, key_columns)
+
+    if sample_column is not None:
+        logger.info(f"Sanity check by batch because too large dataset, sampled on {sample_column}")
+        is_date = column_types[sample_column] in DATE_TYPES
+        low, high = fetch_column_bounds(mysql_url_no_driver, schema, table, sample_column)
+
+        for i in range(1, LOOP_SANITY + 1):
+
+            # Both databases select the same rows for a range, without sorting
+            span = high - low + 1
+            width = random.randint(max(int(span * 0.1), 1), span)
+            start = random.randint(low, high - width + 1)
+            where_clause = range_clause(sample_column, start, start + width, is_date)
 
             is_equal = check_is_equal(
                 schema,
                 table,
-                order_by_clause,
-                limit,
-                offset,
+                key_columns,
                 pg_url,
                 mysql_url_no_driver,
+                where_clause=where_clause,
+                case_insensitive_columns=case_insensitive_columns,
             )
 
             if is_equal:
                 logger.info(f"Progress sanity check : {i/LOOP_SANITY:.0%}")
-                i += 1
-
-                if i == LOOP_SANITY:
-                    logger.success("Sanity check passed !")
-                    return 0
-
             else:
                 logger.warning(f"Sanity check failed")
                 return 1
 
-    else:
-        is_equal = check_is_equal(
-            schema,
-            table,
-            order_by_clause,
-            row_count_sql,
-            0,
-            pg_url,
-            mysql_url_no_driver,
+        logger.success("Sanity check passed !")
+        return 0
+
+    if not key_columns:
+        logger.warning(
+            f"No integer or date column nor primary key to sample {table}, sanity check skipped"
         )
+        return 0
 
-        if is_equal:
-            logger.success("Sanity check passed !")
-            return 0
-        else:
-            logger.warning(f"Sanity check failed")
-            return 1
+    # Read a bounded sample from MySQL, then the same keys from PostgreSQL
+    logger.info(f"Sanity check on {SAMPLE_ROWS} rows because too large dataset, by primary key")
+    is_equal = check_is_equal(
+        schema,
+        table,
+        key_columns,
+        pg_url,
+        mysql_url_no_driver,
+        limit=SAMPLE_ROWS,
+        case_insensitive_columns=case_insensitive_columns,
+    )
+
+    if is_equal:
+        logger.success("Sanity check passed !")
+        return 0
+    else:
+        logger.warning(f"Sanity check failed")
+        return 1
+
+
+@retry_on_failure
+def fetch_primary_key(mysql_url_no_driver, schema, table):
+    """
+    Retrieve the primary key columns of a MySQL table.
+
+    Args:
+        mysql_url_no_driver (str): The connection string for the MySQL database.
+        schema (str): The schema of the table.
+        table (str): The name of the table.
+
+    Returns:
+        list: The primary key columns, lower cased, empty if the table has no primary key.
+    """
+    query = f"""SELECT COLUMN_NAME AS column_name
+                FROM information_schema.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = '{schema}'
+                AND TABLE_NAME = '{table}'
+                AND CONSTRAINT_NAME = 'PRIMARY'
+                ORDER BY ORDINAL_POSITION"""
+    dp = pl.read_database_uri(query, mysql_url_no_driver)
+    return [c.lower() for c in dp.get_column(dp.columns[0]).to_list()]
+
+
+@retry_on_failure
+def fetch_column_types(mysql_url_no_driver, schema, table):
+    """
+    Retrieve the data type of each column of a MySQL table, and its case insensitive columns.
+
+    Args:
+        mysql_url_no_driver (str): The connection string for the MySQL database.
+        schema (str): The schema of the table.
+        table (str): The name of the table.
+
+    Returns:
+        tuple: (data type of each lower cased column, columns with a `_ci` collation).
+    """
+    query = f"""SELECT COLUMN_NAME AS column_name, DATA_TYPE AS data_type,
+                COLLATION_NAME AS collation_name
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = '{schema}'
+                AND TABLE_NAME = '{table}'
+                ORDER BY ORDINAL_POSITION"""
+    dp = pl.read_database_uri(query, mysql_url_no_driver)
+    column_types = {}
+    case_insensitive_columns = []
+    for column, data_type, collation in dp.iter_rows():
+        column_types[column.lower()] = data_type.lower()
+        if collation and collation.lower().endswith("_ci"):
+            case_insensitive_columns.append(column.lower())
+    return column_types, case_insensitive_columns
+
+
+def pick_sample_column(column_types, key_columns):
+    """
+    Pick the column used to sample a large table by range.
+
+    An integer column is preferred, from the primary key first, then a date column: a range
+    filter on it selects the same rows in both databases.
+
+    Args:
+        column_types (dict): The data type of each column, as returned by `fetch_column_types`.
+        key_columns (list): The primary key columns.
+
+    Returns:
+        str: The lower cased column, or None if the table has no integer nor date column.
+    """
+    for types in (INTEGER_TYPES, DATE_TYPES):
+        for column in key_columns + list(column_types):
+            if column_types.get(column) in types:
+                return column
+    return None
+
+
+@retry_on_failure
+def fetch_column_bounds(mysql_url_no_driver, schema, table, column):
+    """
+    Retrieve the bounds of the integer or date column used to sample ranges.
+
+    Dates are returned as day ordinals, see `range_clause`.
+
+    Args:
+        mysql_url_no_driver (str): The connection string for the MySQL database.
+        schema (str): The schema of the table.
+        table (str): The name of the table.
+        column (str): The sample column.
+
+    Returns:
+        tuple: (min, max) of the column, (0, 0) if it only holds NULL.
+    """
+    query = f"SELECT MIN({column}) AS low, MAX({column}) AS high FROM {schema}.{table}"
+    low, high = pl.read_database_uri(query, mysql_url_no_driver).row(0)
+    if low is None or high is None:
+        return 0, 0
+    if isinstance(low, date):
+        return low.toordinal(), high.toordinal()
+    return int(low), int(high)
+
+
+def range_clause(column, start, end, is_date=False):
+    """
+    Build the filter selecting a range of the sample column.
+
+    Dates are given as day ordinals and compared with day literals, which MySQL and
+    PostgreSQL both read as midnight for datetime columns.
+
+    Args:
+        column (str): The sample column.
+        start (int): The first value of the range.
+        end (int): The value following the range.
+        is_date (bool, optional): Whether the column is a date or datetime. Default is False.
+
+    Returns:
+        str: The WHERE clause.
+    """
+    if is_date:
+        start = f"'{date.fromordinal(start).isoformat()}'"
+        end = f"'{date.fromordinal(end).isoformat()}'"
+    return f"{column} >= {start} AND {column} < {end}"
+
+
+def key_literal(value):
+    """
+    Render a primary key value as a SQL literal.
+    """
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (date, datetime, time)):
+        return f"'{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def key_filter(dp, key_columns):
+    """
+    Build the filter selecting the rows of a frame by their primary key.
+
+    Args:
+        dp (polars.DataFrame): The rows, read from MySQL.
+        key_columns (list): The lower cased primary key columns.
+
+    Returns:
+        str: The WHERE clause.
+    """
+    names = {col.lower(): col for col in dp.columns}
+    keys = dp.select([names[c] for c in key_columns]).unique()
+    tuples = ", ".join(
+        "(" + ", ".join(key_literal(value) for value in row) + ")" for row in keys.iter_rows()
+    )
+    return f"({', '.join(key_columns)}) IN ({tuples})"
 
 
 @retry_on_failure
 def check_is_equal(
-    schema, table, order_by_clause, limit, offset, pg_url, mysql_url_no_driver
+    schema,
+    table,
+    key_columns,
+    pg_url,
+    mysql_url_no_driver,
+    where_clause=None,
+    limit=None,
+    case_insensitive_columns=None,
 ):
+    """
+    Compare a sample of a table in both databases.
 
-    query = f"SELECT * FROM {schema}.{table} ORDER BY {order_by_clause} LIMIT {limit} OFFSET {offset}"
+    Rows are matched on the primary key (or a row hash) by `compare_frames`, so neither
+    database has to sort the sample. With a `limit`, the sample is read from MySQL only,
+    and the rows with the same keys are read from PostgreSQL.
 
-    dp_pg = pl.read_database_uri(query, pg_url)
-    dp_sql = pl.read_database_uri(query, mysql_url_no_driver)
-    rename_dict_pg = {col: col.lower() for col in dp_pg.columns}
-    rename_dict_sql = {col: col.lower() for col in dp_sql.columns}
+    Args:
+        schema (str): The schema of the table.
+        table (str): The name of the table.
+        key_columns (list): The primary key columns, may be empty.
+        pg_url (str): The connection string for the PostgreSQL database.
+        mysql_url_no_driver (str): The connection string for the MySQL database.
+        where_clause (str, optional): Filter selecting the sample. Default is None (all rows).
+        limit (int, optional): Rows sampled by key, needs a primary key. Default is None.
+        case_insensitive_columns (list, optional): Strings compared ignoring case. Default is None.
 
-    dp_pg = dp_pg.rename(rename_dict_pg)
-    dp_sql = dp_sql.rename(rename_dict_sql)
+    Returns:
+        bool: True if both samples match.
+    """
 
-    is_equal = dp_pg.equals(dp_sql)
+    query = f"SELECT * FROM {schema}.{table}"
+    if where_clause:
+        query += f" WHERE {where_clause}"
+
+    if limit:
+        query += f" LIMIT {limit}"
+        dp_sql = pl.read_database_uri(query, mysql_url_no_driver)
+        if dp_sql.is_empty():
+            return True
+        keys = key_filter(dp_sql, key_columns)
+        pg_query = f"SELECT * FROM {schema}.{table} WHERE {keys}"
+        if where_clause:
+            pg_query += f" AND {where_clause}"
+        dp_pg = pl.read_database_uri(pg_query, pg_url)
+    else:
+        dp_pg = pl.read_database_uri(query, pg_url)
+        dp_sql = pl.read_database_uri(query, mysql_url_no_driver)
+
+    report = compare_frames(
+        dp_sql,
+        dp_pg,
+        key_columns=key_columns,
+        case_insensitive_columns=case_insensitive_columns,
+    )
+    is_equal = is_report_equal(report)
 
     if not is_equal:
         logger.debug(f"Query : {query}")
-        logger.debug(f"PostgreSQL : {dp_pg}")
-        logger.debug(f"MySQL : {dp_sql}")
-    
+        logger.warning(
+            f"Rows missing in PostgreSQL : {report['missing_in_target']}, "
+            f"rows missing in MySQL : {report['missing_in_source']}"
+        )
+        if report["missing_columns"]:
+            logger.warning(f"Columns on one side only : {report['missing_columns']}")
+        if report["differing_columns"]:
+            logger.warning(f"Differing columns (mismatching rows) : {report['differing_columns']}")
+
     return is_equal
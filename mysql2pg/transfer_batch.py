@@ -2,6 +2,19 @@ from mysql2pg.utils import check_and_create_schema
 import time
 from loguru import logger
 import polars as pl
+from mysql2pg.ddl import DDL_WORKERS
+from mysql2pg.network import NetworkStats
+from mysql2pg.partitioning import (
+    MAX_PARTITIONS,
+    build_partition_indexes,
+    close_partition_connections,
+    create_partitioned_table,
+    fetch_partition_bounds,
+    list_partitions,
+    open_partition_connections,
+    route_partitions,
+    transfer_partitions,
+)
 from mysql2pg.retry_decorator import retry_on_failure
 
 
@@ -15,6 +28,8 @@ def transfer_data_in_batches(
     batch_size=50000,
     offset_start=0,
     row_total=0,
+    partition=None,
+    max_workers=DDL_WORKERS,
 ):
     """
     Transfer data from the source database to the target database in batches.
@@ -29,49 +44,84 @@ def transfer_data_in_batches(
         batch_size (int, optional): The number of rows to transfer in each batch. Default is 50000.
         offset_start (int, optional): The starting offset for the transfer. Default is 0.
         row_total (int, optional): The total number of rows to transfer. Default is 0.
+        partition (dict, optional): The `partition_by` entry of the table. Default is None (plain table).
+        max_workers (int, optional): Partitions loaded and indexed at once. Default is 8.
+
+    Returns:
+        dict: The network bytes of the transfer, see `NetworkStats.report`.
     """
 
     check_and_create_schema(target_engine, schema)
+    network_stats = NetworkStats(source_engine)
+
+    connections = []
+    if partition is not None:
+        partition = {**partition, "column": partition["column"].lower()}
+        bounds = None
+        if partition["method"] == "range":
+            bounds = fetch_partition_bounds(source_string, table, partition["column"])
+        children = list_partitions(
+            table, partition, bounds, partition.get("max_partitions", MAX_PARTITIONS)
+        )
+        connections = open_partition_connections(target_string, max_workers)
 
-    offset = offset_start
-    while True:
-
-        # Fetch a batch of data from the source table
-        query = f"SELECT * FROM {table} LIMIT {batch_size} OFFSET {offset}"
-
-        logger.info(f"Table : {table}")
-        start_time = time.time()
-
-        dp = download_batch(query, source_string)
-        end_time = time.time()
-        duration = end_time - start_time
-        logger.info(f"Read batch from MySQL in {duration:.2f}s")
-
-        binary_columns = [
-            name for name, dtype in dp.schema.items() if dtype == pl.Binary
-        ]
-        for col in binary_columns:
-            dp = dp.with_columns(pl.col(col).cast(pl.Utf8))
-
-        if dp.is_empty():
-            logger.success(f"Data migration done for {table} ! \n")
-            break
-
-        # lower case
-        rename_dict = {col: col.lower() for col in dp.columns}
-        dp = dp.rename(rename_dict)
-
-        # Load the batch into the target table
-        start_time = time.time()
-
-        transfer_batch(dp, schema, table, target_string, offset)
-
-        end_time = time.time()
-        duration = end_time - start_time
-        logger.info(f"Transferred {dp.select(pl.len()).item()} rows in {duration:.2f}s")
-
-        offset += batch_size
-        logger.info(f"Progress : {min(offset/row_total, 1):.2%}\n")
+    try:
+        offset = offset_start
+        while True:
+
+            # Fetch a batch of data from the source table
+            query = f"SELECT * FROM {table} LIMIT {batch_size} OFFSET {offset}"
+
+            logger.info(f"Table : {table}")
+            start_time = time.time()
+
+            dp = download_batch(query, source_string)
+            end_time = time.time()
+            duration = end_time - start_time
+            logger.info(f"Read batch from MySQL in {duration:.2f}s")
+            network_stats.add_download(dp, duration)
+
+            binary_columns = [
+                name for name, dtype in dp.schema.items() if dtype == pl.Binary
+            ]
+            for col in binary_columns:
+                dp = dp.with_columns(pl.col(col).cast(pl.Utf8))
+
+            if dp.is_empty():
+                if partition is not None:
+                    build_partition_indexes(
+                        target_engine, schema, table, partition, children, max_workers=max_workers
+                    )
+                logger.success(f"Data migration done for {table} ! \n")
+                break
+
+            # lower case
+            rename_dict = {col: col.lower() for col in dp.columns}
+            dp = dp.rename(rename_dict)
+
+            # Load the batch into the target table
+            start_time = time.time()
+
+            if partition is not None:
+                if offset == offset_start:
+                    create_partitioned_table(target_engine, dp, schema, table, partition, children)
+                parts = route_partitions(dp, table, partition, children)
+                transfer_partitions(parts, schema, connections)
+            else:
+                transfer_batch(dp, schema, table, target_string, offset)
+            network_stats.add_upload(dp)
+
+            end_time = time.time()
+            duration = end_time - start_time
+            logger.info(f"Transferred {dp.select(pl.len()).item()} rows in {duration:.2f}s")
+
+            offset += batch_size
+            logger.info(f"Progress : {min(offset/row_total, 1):.2%}\n")
+    finally:
+        close_partition_connections(connections)
+
+    network_stats.stop()
+    return network_stats.report(table)
 
 
 @retry_on_failure
@@ -1,42 +1,140 @@
 import sqlalchemy as sa
-import pandas as pd
 from loguru import logger
+from ssl import create_default_context
+from urllib.parse import quote_plus, urlencode
+from mysql2pg.ddl import LOCK_TIMEOUT, compile_alter_table, execute_ddl
 from mysql2pg.retry_decorator import retry_on_failure
 
 
-def create_engine(url):
+def create_engine(url, **kwargs):
     """
     Create an SQLAlchemy engine.
 
     Args:
         url (str): The database URL.
+        **kwargs: Extra arguments for `sqlalchemy.create_engine` (e.g. pool_size).
 
     Returns:
         sqlalchemy.engine.Engine: An SQLAlchemy engine.
     """
-    return sa.create_engine(url)
+    return sa.create_engine(url, **kwargs)
+
+
+def build_pg_url(cfg):
+    """
+    Build the PostgreSQL URL, with the optional `pg_ssl` libpq parameters.
+
+    The same URL is used by SQLAlchemy (psycopg2), connectorx and ADBC, which all accept
+    the libpq `sslmode`, `sslrootcert`, `sslcert` and `sslkey` parameters.
+
+    Args:
+        cfg (dict): The configuration.
+
+    Returns:
+        str: The PostgreSQL URL.
+    """
+    encoded_password = quote_plus(cfg["pg_password"])
+    pg_url = f'postgresql://{cfg["pg_username"]}:{encoded_password}@{cfg["pg_host"]}:{cfg["pg_port"]}/{cfg["pg_database"]}'
+    params = {key: value for key, value in (cfg.get("pg_ssl") or {}).items() if value is not None}
+    return f"{pg_url}?{urlencode(params)}" if params else pg_url
+
+
+def build_mysql_urls(
+    sql_username, sql_password, sql_host, sql_port, schema, compression=None, ssl=None
+):
+    """
+    Build the MySQL URLs for SQLAlchemy (PyMySQL) and for connectorx.
+
+    Protocol compression only applies to the connectorx URL, used to download the data:
+    PyMySQL does not support it, and it only runs metadata queries. Only zlib is supported by
+    the drivers, `zstd` falls back to zlib.
+
+    PyMySQL gets the SSL settings as an `ssl.SSLContext` through `connect_args`, verifying the
+    server against `ca` or the system trust store. The connectorx URL can only require SSL
+    and verify the server against the system trust store: a private `ca` must be installed
+    there, and client certificates (`cert` / `key`) are not supported.
+
+    Args:
+        sql_username (str): The MySQL username.
+        sql_password (str): The MySQL password.
+        sql_host (str): The MySQL host.
+        sql_port (int): The MySQL port.
+        schema (str): The MySQL database.
+        compression (str, optional): Protocol compression, "zlib", "zstd" or None. Default is None.
+        ssl (dict, optional): `ca`, `cert`, `key` and `verify_identity` settings. Default is None.
+
+    Returns:
+        tuple: (SQLAlchemy URL, connectorx URL, SQLAlchemy `connect_args`).
+    """
+    encoded_password = quote_plus(str(sql_password))
+    base_url = f"{sql_username}:{encoded_password}@{sql_host}:{sql_port}/{schema}"
+
+    connect_args = {}
+    connectorx_params = {}
+    if ssl:
+        if ssl.get("cert") or ssl.get("key"):
+            raise ValueError(
+                "MySQL client certificates (mysql_ssl cert / key) are not supported by "
+                "connectorx, used to download the data"
+            )
+        if ssl.get("ca"):
+            logger.warning(
+                "connectorx cannot use mysql_ssl ca : the data download verifies the server "
+                "against the system trust store, where this CA must be installed"
+            )
+        verify_identity = bool(ssl.get("verify_identity"))
+        # PyMySQL turns check_hostname off without a CA, an explicit context keeps it
+        context = create_default_context(cafile=ssl.get("ca"))
+        context.check_hostname = verify_identity
+        connect_args["ssl"] = context
+        connectorx_params["require_ssl"] = "true"
+        connectorx_params["verify_ca"] = "true"
+        connectorx_params["verify_identity"] = str(verify_identity).lower()
+
+    if compression:
+        if compression not in ("zlib", "zstd"):
+            raise ValueError(f"Unknown MySQL compression {compression}, expected zlib or zstd")
+        if compression == "zstd":
+            logger.warning("zstd compression is not supported by the MySQL drivers, using zlib")
+        connectorx_params["compress"] = "true"
+
+    mysql_url = f"mysql+pymysql://{base_url}"
+    sql_url_no_driver = f"mysql://{base_url}"
+    if connectorx_params:
+        sql_url_no_driver += f"?{urlencode(connectorx_params)}"
+    return mysql_url, sql_url_no_driver, connect_args
 
 
 @retry_on_failure
-def sync_table_structure(mysql_engine, postgresql_engine, schema, table_name):
+def sync_table_structure(
+    mysql_engine, postgresql_engine, schema, table_name, lock_timeout=LOCK_TIMEOUT
+):
     """
     Synchronize the table structure from a MySQL database to a PostgreSQL database.
 
+    All the changes of the table are applied with a single multi-clause ALTER TABLE. MySQL
+    AUTO_INCREMENT columns become identity columns, see `sync_sequences` for their value.
+
     Args:
         mysql_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the MySQL database.
         postgresql_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
         schema (str): The target schema in the PostgreSQL database.
         table_name (str): The name of the table to synchronize.
+        lock_timeout (str, optional): PostgreSQL lock_timeout for the ALTER TABLE. Default is "5s".
+
+    Returns:
+        float: The time spent applying the DDL, in seconds (0 if nothing to synchronize).
     """
     logger.info(f"Synchronize structure of {table_name}")
 
     mysql_query = sa.text(f"DESCRIBE {table_name}")
 
     pg_query = sa.text(
-        f"""SELECT column_name, is_nullable
+        f"""SELECT column_name, is_nullable, is_identity, column_default
             FROM information_schema.columns
             WHERE table_schema = '{schema}'
-            AND table_name = '{table_name}'"""
+            AND table_name = '{table_name}'
+            ORDER BY ordinal_position"""
     )
 
     pg_query_constraints = f"""SELECT constraint_name, column_name
@@ -51,55 +149,64 @@ def sync_table_structure(mysql_engine, postgresql_engine, schema, table_name):
                                 AND constraint_type = 'PRIMARY KEY'
                             );"""
 
+    # Partition key of the table, if it is a partitioned parent
+    pg_query_partition = sa.text(
+        """SELECT p.partexprs IS NOT NULL AS has_expression, a.attname
+            FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_attribute a
+                ON a.attrelid = p.partrelid AND a.attnum = ANY(p.partattrs::int2[])
+            WHERE n.nspname = :schema
+            AND c.relname = :table"""
+    )
+
     with mysql_engine.connect() as connection:
         table_info = connection.execute(mysql_query).fetchall()
     columns_sql = [c[0] for c in table_info]
 
-    columns_postgre = pd.read_sql(pg_query, postgresql_engine).column_name.to_list()
-    pkey_postgre = pd.read_sql(
-        pg_query_constraints, postgresql_engine
-    ).column_name.to_list()
-    is_nullable_postgre = (
-        pd.read_sql(pg_query, postgresql_engine)
-        .query("is_nullable == 'YES'")
-        .column_name.to_list()
-    )
+    with postgresql_engine.connect() as connection:
+        columns_info = connection.execute(pg_query).fetchall()
+        pkey_info = connection.execute(sa.text(pg_query_constraints)).fetchall()
+        partition_info = connection.execute(
+            pg_query_partition, {"schema": schema, "table": table_name}
+        ).fetchall()
+
+    columns_postgre = [c[0] for c in columns_info]
+    pkey_postgre = [c[1] for c in pkey_info]
+    is_nullable_postgre = [c[0] for c in columns_info if c[1] == "YES"]
+    sequence_postgre = [
+        c[0]
+        for c in columns_info
+        if c[2] == "YES" or (c[3] is not None and c[3].startswith("nextval("))
+    ]
 
     mapping_columns = {
         columns_sql[idx]: columns_postgre[idx] for idx in range(len(columns_sql))
     }
     columns_pk = []
-    query_total_default = ""
-    query_total_nullable = ""
+    clauses_default = []
+    clauses_nullable = []
+    clauses_identity = []
 
     for column in table_info:
         column_name = column[0]
-        data_type = column[1]
         is_notnull = "NOT_NULL" if column[2] == "NO" else False
         default_value = column[4] if column[4] else False
         primary_key = True if column[3] == "PRI" else False
+        auto_increment = "auto_increment" in (column[5] or "").lower()
         col_pg = mapping_columns[column_name]
-        query_start = f"ALTER TABLE {schema}.{table_name} "
 
-        query_default = ""
         if default_value:
             logger.info(f"Adding default value {default_value} for {col_pg}")
-            query_default = (
-                query_start
-                + f"""ALTER COLUMN "{col_pg}" SET DEFAULT {default_value}; """
-            )
+            clauses_default.append(f"""ALTER COLUMN "{col_pg}" SET DEFAULT {default_value}""")
 
-        query_nullable = ""
         if is_notnull:
             if not col_pg in is_nullable_postgre:
                 logger.info(f"Column : {col_pg} already under not nullable constraint")
             else:
                 logger.info(f"Adding NOT NULL constraint for {col_pg}")
-                query_nullable = (
-                    query_start + f"""ALTER COLUMN "{col_pg}" SET NOT NULL; """
-                )
-        else:
-            f"ALTER COLUMN {column_name} DROP NOT NULL; "
+                clauses_nullable.append(f"""ALTER COLUMN "{col_pg}" SET NOT NULL""")
 
         if primary_key:
 
@@ -109,24 +216,189 @@ def sync_table_structure(mysql_engine, postgresql_engine, schema, table_name):
                 logger.info(f"Adding primary key for {col_pg}")
                 columns_pk.append(f'"{col_pg}"')
 
-        query_total_default += query_default
-        query_total_nullable += query_nullable
+        if auto_increment:
+            if col_pg in sequence_postgre:
+                logger.info(f"Column : {col_pg} already backed by a sequence")
+            else:
+                logger.info(f"Adding identity for {col_pg}")
+                clauses_identity.append(
+                    f"""ALTER COLUMN "{col_pg}" ADD GENERATED BY DEFAULT AS IDENTITY"""
+                )
 
-    if len(columns_pk) > 0:
-        query_pk = f"ALTER TABLE {schema}.{table_name} ADD PRIMARY KEY ({', '.join(columns_pk)}); "
-    else:
-        query_pk = ""
-    query = query_total_default + query_total_nullable + query_pk
-    if len(query) > 0:
+    # A primary key of a partitioned table must contain the partition columns, and is not
+    # possible at all when the partition key is an expression
+    if columns_pk and partition_info:
+        if any(c[0] for c in partition_info):
+            logger.warning(
+                f"Primary key skipped for {table_name} : partitioned on an expression"
+            )
+            columns_pk = []
+        else:
+            for c in partition_info:
+                if f'"{c[1]}"' not in columns_pk:
+                    logger.info(f"Adding partition column {c[1]} to the primary key")
+                    columns_pk.append(f'"{c[1]}"')
+
+    clauses_pk = [f"ADD PRIMARY KEY ({', '.join(columns_pk)})"] if columns_pk else []
+    query = compile_alter_table(
+        f"{schema}.{table_name}",
+        clauses_default + clauses_nullable + clauses_pk + clauses_identity,
+    )
+    if query:
         try:
-            with postgresql_engine.connect() as connection:
-                connection.execute(sa.text(query))
-                connection.commit()
+            duration = execute_ddl(
+                postgresql_engine, [query], f"{schema}.{table_name}", lock_timeout=lock_timeout
+            )
             logger.success(f"Synchronization done ! \n\n")
+            return duration
         except Exception as e:
             logger.error(e)
     else:
         logger.success(f"Nothing to synchronize ! \n\n")
+    return 0
+
+
+@retry_on_failure
+def fetch_auto_increment(mysql_engine, schema):
+    """
+    Retrieve the AUTO_INCREMENT columns of a MySQL schema and their next value.
+
+    Both come from the catalog (information_schema.COLUMNS.EXTRA and
+    information_schema.TABLES.AUTO_INCREMENT), with one query each for the whole schema.
+
+    Args:
+        mysql_engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the MySQL database.
+        schema (str): The MySQL schema.
+
+    Returns:
+        tuple: (AUTO_INCREMENT column of each table, next AUTO_INCREMENT value of each table).
+    """
+
+    with mysql_engine.connect() as connection:
+        try:
+            # MySQL 8 caches the catalog statistics, read the current values instead
+            connection.execute(sa.text("SET SESSION information_schema_stats_expiry = 0"))
+        except Exception as e:
+            logger.warning(
+                f"Could not disable the catalog statistics cache, AUTO_INCREMENT values may be "
+                f"stale : {e}"
+            )
+        columns = connection.execute(
+            sa.text(
+                """SELECT TABLE_NAME, COLUMN_NAME
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = :schema
+                AND EXTRA LIKE '%auto_increment%'"""
+            ),
+            {"schema": schema},
+        ).fetchall()
+        next_values = connection.execute(
+            sa.text(
+                """SELECT TABLE_NAME, AUTO_INCREMENT
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = :schema
+                AND AUTO_INCREMENT IS NOT NULL"""
+            ),
+            {"schema": schema},
+        ).fetchall()
+
+    return dict(columns), {table: int(value) for table, value in next_values}
+
+
+def sync_sequences(
+    engine,
+    schema,
+    auto_increment_columns,
+    next_values,
+    lock_timeout=LOCK_TIMEOUT,
+    chunk_size=500,
+):
+    """
+    Set the sequences of the migrated AUTO_INCREMENT columns in a single bulk pass.
+
+    Each sequence restarts at the MySQL next AUTO_INCREMENT value, or at MAX + 1 of the
+    column if it is higher. The MAX is only read when the column leads an index, so it is an
+    index lookup, never a scan. Columns without a sequence (e.g. the identity could not be
+    added) are skipped and reported.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the PostgreSQL database.
+        schema (str): The schema in the PostgreSQL database.
+        auto_increment_columns (dict): The AUTO_INCREMENT column of each table.
+        next_values (dict): The next MySQL AUTO_INCREMENT value of each table.
+        lock_timeout (str, optional): PostgreSQL lock_timeout for the pass. Default is "5s".
+        chunk_size (int, optional): Number of sequences set per statement. Default is 500.
+
+    Returns:
+        float: The time spent setting the sequences, in seconds.
+    """
+    candidates = sorted((table, column.lower()) for table, column in auto_increment_columns.items())
+    if not candidates:
+        return 0
+
+    # Check in one catalog query which columns have a sequence and lead an index
+    values = ", ".join(f"(:table_{idx}, :column_{idx})" for idx in range(len(candidates)))
+    params = {"schema": schema}
+    for idx, (table_name, column) in enumerate(candidates):
+        params[f"table_{idx}"] = table_name
+        params[f"column_{idx}"] = column
+    with engine.connect() as connection:
+        catalog = connection.execute(
+            sa.text(
+                f"""SELECT v.table_name, v.column_name,
+                    pg_get_serial_sequence(:schema || '.' || v.table_name, v.column_name)
+                        IS NOT NULL AS has_sequence,
+                    EXISTS (
+                        SELECT 1
+                        FROM pg_index i
+                        JOIN pg_attribute a
+                            ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                        WHERE i.indrelid = to_regclass(:schema || '.' || v.table_name)
+                        AND a.attname = v.column_name
+                    ) AS is_indexed
+                FROM (VALUES {values}) AS v(table_name, column_name)"""
+            ),
+            params,
+        ).fetchall()
+
+    setvals = []
+    skipped = []
+    for table_name, column, has_sequence, is_indexed in catalog:
+        if not has_sequence:
+            skipped.append(f"{table_name}.{column}")
+            continue
+        candidates_value = []
+        if table_name in next_values:
+            candidates_value.append(str(next_values[table_name]))
+        if is_indexed or not candidates_value:
+            candidates_value.append(
+                f'(SELECT COALESCE(MAX("{column}"), 0) + 1 FROM {schema}.{table_name})'
+            )
+        if not is_indexed and table_name in next_values:
+            logger.warning(f"{table_name}.{column} is not indexed, restarted from MySQL catalog")
+        elif not is_indexed:
+            logger.warning(f"{table_name}.{column} is not indexed and has no MySQL value, scanned")
+        next_value = (
+            f"GREATEST({', '.join(candidates_value)})"
+            if len(candidates_value) > 1
+            else candidates_value[0]
+        )
+        sequence = f"pg_get_serial_sequence('{schema}.{table_name}', '{column}')"
+        setvals.append(f"setval({sequence}, {next_value}, false)")
+
+    if skipped:
+        logger.warning(f"No sequence to synchronize for {len(skipped)} columns : {skipped}")
+
+    if not setvals:
+        return 0
+
+    statements = [
+        "SELECT " + ", ".join(setvals[idx : idx + chunk_size]) + ";"
+        for idx in range(0, len(setvals), chunk_size)
+    ]
+    duration = execute_ddl(engine, statements, f"{schema} sequences", lock_timeout=lock_timeout)
+    logger.success(f"{len(setvals)} sequences synchronized for schema {schema}")
+    return duration
 
 
 @retry_on_failure
@@ -159,6 +431,30 @@ def check_if_table_exists(table_name, engine):
         return 0
 
 
+def check_if_table_has_rows(table_name, engine, schema=None):
+    """
+    Check if a table exists and holds at least one row, without counting them.
+
+    Args:
+        table_name (str): The name of the table to check.
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the database.
+        schema (str, optional): The schema of the table. Defaults to None.
+
+    Returns:
+        bool: True if the table exists and is not empty.
+    """
+
+    full_table_name = f"{schema}.{table_name}" if schema else table_name
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(
+                sa.text(f"SELECT 1 FROM {full_table_name} LIMIT 1")
+            ).fetchone()
+        return row is not None
+    except Exception:
+        return False
+
+
 @retry_on_failure
 def fetch_tables(engine, schema=None):
     """
@@ -246,33 +542,80 @@ def purge_schemas(engine):
             raise
 
 
-def rename_columns_to_lowercase(engine, table_name, schema_name=None):
+def fetch_columns(engine, schema_name):
+    """
+    Retrieve the columns of every table of a schema with a single catalog query.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the database.
+        schema_name (str): The schema name.
+
+    Returns:
+        dict: The column names of each table, in ordinal order.
+    """
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            sa.text(
+                """SELECT table_name, column_name
+                FROM information_schema.columns
+                WHERE table_schema = :schema
+                ORDER BY table_name, ordinal_position"""
+            ),
+            {"schema": schema_name},
+        ).fetchall()
+
+    columns = {}
+    for table_name, column_name in rows:
+        columns.setdefault(table_name, []).append(column_name)
+    return columns
+
+
+def rename_columns_to_lowercase(
+    engine, table_name, schema_name=None, columns=None, lock_timeout=LOCK_TIMEOUT
+):
     """
     Rename all columns in a table to lowercase.
 
+    PostgreSQL does not allow several RENAME COLUMN in one ALTER TABLE, so the renames are
+    sent together in a single transaction.
+
     Args:
         engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for the database.
         table_name (str): The name of the table.
         schema_name (str, optional): The schema name. Defaults to None.
-    """
+        columns (list, optional): The column names, as returned by `fetch_columns`. Defaults to None (queried).
+        lock_timeout (str, optional): PostgreSQL lock_timeout for the renames. Default is "5s".
 
-    metadata = sa.MetaData()
-    metadata.reflect(bind=engine, schema=schema_name)
+    Returns:
+        float: The time spent applying the DDL, in seconds (0 if nothing to rename).
+    """
 
-    table = sa.Table(table_name, metadata, schema=schema_name, autoload_with=engine)
+    if columns is None:
+        schema_filter = ":schema" if schema_name else "current_schema()"
+        with engine.connect() as connection:
+            columns = [
+                row[0]
+                for row in connection.execute(
+                    sa.text(
+                        f"""SELECT column_name
+                        FROM information_schema.columns
+                        WHERE table_schema = {schema_filter}
+                        AND table_name = :table"""
+                    ),
+                    {"schema": schema_name, "table": table_name},
+                ).fetchall()
+            ]
+
+    full_table_name = f"{schema_name}.{table_name}" if schema_name else table_name
+    statements = [
+        f'ALTER TABLE {full_table_name} RENAME COLUMN "{column}" TO "{column.lower()}";'
+        for column in columns
+        if column != column.lower()
+    ]
+    if not statements:
+        return 0
 
-    with engine.connect() as connection:
-        # Begin a transaction
-        with connection.begin():
-            # Rename columns to lowercase
-            for column in table.columns:
-                if column.name != column.name.lower():
-                    old_name = column.name
-                    new_name = column.name.lower()
-                    rename_column_query = sa.text(
-                        f'ALTER TABLE {table.fullname} RENAME COLUMN "{old_name}" TO "{new_name}";'
-                    )
-                    connection.execute(rename_column_query)
-                    logger.info(
-                        f"Renamed column {old_name} to {new_name} for table {table_name}"
-                    )
+    duration = execute_ddl(engine, statements, table_name, lock_timeout=lock_timeout)
+    logger.info(f"Renamed {len(statements)} columns to lowercase for table {table_name}")
+    return duration
@@ -0,0 +1,115 @@
+import math
+from datetime import datetime
+
+import polars as pl
+
+from mysql2pg.compare import compare_frames, is_report_equal
+
+
+def test_key_join_ignores_row_order_and_column_case():
+    source = pl.DataFrame({"ID": [1, 2, 3], "Name": ["a", "b", "c"]})
+    target = pl.DataFrame({"id": [3, 1, 2], "name": ["c", "a", "b"]})
+
+    report = compare_frames(source, target, key_columns=["ID"])
+
+    assert is_report_equal(report)
+
+
+def test_key_join_reports_differing_and_missing_rows():
+    source = pl.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"]})
+    target = pl.DataFrame({"id": [1, 2, 4], "name": ["a", "x", "d"]})
+
+    report = compare_frames(source, target, key_columns=["id"])
+
+    assert report["missing_in_target"] == 1
+    assert report["missing_in_source"] == 1
+    assert report["differing_columns"] == {"name": 1}
+    assert not is_report_equal(report)
+
+
+def test_row_hash_matches_duplicate_rows_one_to_one():
+    source = pl.DataFrame({"a": [1, 1, 2], "b": ["x", "x", "y"]})
+    target = pl.DataFrame({"a": [2, 1, 1], "b": ["y", "x", "x"]})
+
+    assert is_report_equal(compare_frames(source, target))
+
+    report = compare_frames(source, target.head(2))
+    assert report["missing_in_target"] == 1
+    assert report["missing_in_source"] == 0
+
+
+def test_row_hash_reports_missing_rows_on_each_side():
+    source = pl.DataFrame({"a": [1, 2, 3]})
+    target = pl.DataFrame({"a": [2, 3, 4, 5]})
+
+    report = compare_frames(source, target)
+
+    assert report["missing_in_target"] == 1
+    assert report["missing_in_source"] == 2
+
+
+def test_floats_within_relative_tolerance_match():
+    values = [1e12 + 0.25, 3.141592653589793, 0.1, -2.5e-3]
+    source = pl.DataFrame({"id": [1, 2, 3, 4], "value": values})
+    target = pl.DataFrame({"id": [1, 2, 3, 4], "value": [v * (1 + 5e-11) for v in values]})
+
+    assert is_report_equal(compare_frames(source, target, key_columns=["id"]))
+    assert is_report_equal(compare_frames(source, target))
+
+
+def test_floats_beyond_tolerance_differ():
+    source = pl.DataFrame({"id": [1, 2], "value": [100.0, 200.0]})
+    target = pl.DataFrame({"id": [1, 2], "value": [100.1, 200.0]})
+
+    report = compare_frames(source, target, key_columns=["id"])
+
+    assert report["differing_columns"] == {"value": 1}
+
+
+def test_nan_and_null_handling():
+    source = pl.DataFrame(
+        {"id": [1, 2, 3, 4], "value": [math.nan, None, None, 1.0], "name": [None, "a", None, "b"]}
+    )
+    target = pl.DataFrame(
+        {"id": [1, 2, 3, 4], "value": [math.nan, None, 1.0, None], "name": [None, "a", "c", "b"]}
+    )
+
+    report = compare_frames(source, target, key_columns=["id"])
+
+    assert report["missing_in_target"] == 0
+    assert report["missing_in_source"] == 0
+    assert report["differing_columns"] == {"value": 2, "name": 1}
+
+
+def test_normalisation_of_strings_and_timestamps():
+    source = pl.DataFrame(
+        {
+            "id": [1],
+            "code": ["ABC  "],
+            "created": [datetime(2024, 1, 1, 12, 0, 0, 123456)],
+            "amount": pl.Series([5], dtype=pl.Int32),
+        }
+    )
+    target = pl.DataFrame(
+        {
+            "id": [1],
+            "code": ["abc"],
+            "created": [datetime(2024, 1, 1, 12, 0, 0, 123456)],
+            "amount": pl.Series([5], dtype=pl.Int64),
+        }
+    )
+
+    assert compare_frames(source, target, key_columns=["id"])["differing_columns"] == {"code": 1}
+    assert is_report_equal(
+        compare_frames(source, target, key_columns=["id"], case_insensitive_columns=["code"])
+    )
+
+
+def test_missing_columns_are_reported():
+    source = pl.DataFrame({"id": [1], "extra": [1]})
+    target = pl.DataFrame({"id": [1]})
+
+    report = compare_frames(source, target, key_columns=["id"])
+
+    assert report["missing_columns"] == ["extra"]
+    assert not is_report_equal(report)
@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+from importlib.util import find_spec
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+ENGINE_MODULES = ["polars", "sqlalchemy", "connectorx"]
+HEAVY_MODULES = ENGINE_MODULES + ["pandas"]
+
+PROBE = """
+import json, sys
+import mysql2pg.app
+{command}
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"loaded": loaded}}))
+"""
+
+
+def run_probe(command=""):
+    # The probe only proves something if the engines could have been imported
+    for name in ENGINE_MODULES:
+        if find_spec(name) is None:
+            pytest.skip(f"{name} is not installed")
+    code = PROBE.format(command=command, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cli_import_does_not_load_engines():
+    assert run_probe()["loaded"] == []
+
+
+def test_version_command_does_not_load_engines():
+    probe = run_probe('mysql2pg.app.app(["version"], standalone_mode=False)')
+    assert probe["loaded"] == []